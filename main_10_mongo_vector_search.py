@@ -1,10 +1,27 @@
 from dotenv import load_dotenv
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import io
 import os
+import threading
+import traceback
+from typing import List, Tuple
+import numpy as np
+from bson import Binary
 from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+from pymongo.operations import SearchIndexModel
 from langchain_mongodb import MongoDBAtlasVectorSearch
 from langchain_ollama import OllamaEmbeddings
 from langchain_core.documents import Document
+from ollama_embeddings import CachedOllamaEmbeddings
+from shared_http import ollama_client_kwargs
+
+try:
+    import simsimd  # SIMD cosine kernels (AVX2/AVX-512/NEON picked at runtime)
+except ImportError:
+    simsimd = None
 
 load_dotenv(dotenv_path=Path(__file__).parent / '.env')
 
@@ -16,6 +33,11 @@ INDEX_NAME = os.environ.get('MONGO_INDEX_NAME', 'vector_index')
 
 # Embedding model to use with Ollama
 EMBED_MODEL = os.environ.get('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
+EMBED_BATCH_SIZE = int(os.environ.get('OLLAMA_EMBED_BATCH_SIZE', 32))  # texts per /api/embed request
+EMBED_DIMENSIONS = int(os.environ.get('OLLAMA_EMBED_DIMENSIONS', 768))  # nomic-embed-text vector size
+
+# Number of results shown per query
+TOP_K = int(os.environ.get('SEARCH_TOP_K', 2))
 
 # Simple documents to index (similar to your real Chroma example)
 DOCUMENTS = [
@@ -33,6 +55,13 @@ DOCUMENTS = [
     )
 ]
 
+# Process-lifetime cache of the fallback search data: the stacked int8
+# embedding matrix, per-document scale / L2 norm weights and the matching
+# document ids (display fields are fetched only for the top results).
+# Filled lazily by ensure_cache_warm() and cleared whenever documents are added.
+_cache = {"matrix": None, "weights": None, "ids": None}
+_cache_lock = threading.Lock()
+
 
 def get_vector_store(client: MongoClient, embeddings: OllamaEmbeddings) -> MongoDBAtlasVectorSearch:
     """Create or get MongoDBAtlasVectorSearch instance.
@@ -55,6 +84,241 @@ def get_vector_store(client: MongoClient, embeddings: OllamaEmbeddings) -> Mongo
     return vector_store
 
 
+def ensure_vector_index(collection: Collection) -> bool:
+    """Create the Atlas Vector Search index on `embedding` unless it already exists.
+
+    Atlas builds the (HNSW) index in the background; until it is queryable,
+    searches use the local fallback. Returns False when the deployment does
+    not support search indexes (e.g. a non-Atlas MongoDB).
+    """
+    try:
+        if any(index.get("name") == INDEX_NAME for index in collection.list_search_indexes(INDEX_NAME)):
+            return True
+
+        collection.create_search_index(SearchIndexModel(
+            name=INDEX_NAME,
+            type="vectorSearch",
+            definition={
+                "fields": [{
+                    "type": "vector",
+                    "path": "embedding",
+                    "numDimensions": EMBED_DIMENSIONS,
+                    "similarity": "cosine",
+                }]
+            },
+        ))
+        return True
+    except OperationFailure as e:
+        if "already exists" in str(e):
+            return True
+        print(f"⚠️  Could not create Atlas Vector Search index: {str(e)[:100]}")
+        return False
+
+
+def quantize_int8(vector) -> Tuple[np.ndarray, float]:
+    """Symmetric per-vector int8 quantization: vector ~= quantized * scale."""
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.abs(vector).max()) / 127.0
+    if scale == 0.0:
+        return np.zeros(vector.shape, dtype=np.int8), 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+def add_documents(collection: Collection, embeddings: OllamaEmbeddings, documents: List[Document]) -> List[str]:
+    """Embed and insert documents in the layout MongoDBAtlasVectorSearch reads.
+
+    Alongside the float embedding used by Atlas Vector Search, each document
+    stores an int8 copy (as BSON binary) plus its scale, so the local fallback
+    scan reads 768 bytes per nomic-embed-text vector instead of 3 KB. The L2
+    norm is stored too, so searches never recompute it.
+    """
+    vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+
+    records = []
+    for doc, vector in zip(documents, vectors):
+        quantized, scale = quantize_int8(vector)
+        records.append({
+            "page_content": doc.page_content,
+            "embedding": vector,
+            "embedding_i8": Binary(quantized.tobytes()),
+            "embedding_scale": scale,
+            "embedding_norm": float(np.linalg.norm(vector)),
+            **doc.metadata,
+        })
+
+    result = collection.insert_many(records)
+    invalidate_cache()
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+
+def invalidate_cache() -> None:
+    """Drop the in-memory fallback cache so the next search reloads it."""
+    with _cache_lock:
+        _cache["matrix"] = None
+        _cache["weights"] = None
+        _cache["ids"] = None
+
+
+def ensure_cache_warm(collection: Collection) -> Tuple[np.ndarray, np.ndarray, list]:
+    """Load every embedded document once and stack its int8 copy into an (N, D) matrix.
+
+    Later searches score against the cached matrix instead of rescanning and
+    deserializing the whole collection per query. Returns (matrix, weights, ids).
+    """
+    with _cache_lock:
+        if _cache["matrix"] is None:
+            _load_cache(collection)
+        return _cache["matrix"], _cache["weights"], _cache["ids"]
+
+
+def _load_cache(collection: Collection) -> None:
+    # Project only what ranking needs; page_content and metadata stay on the server
+    docs = list(collection.find(
+        {'embedding_i8': {'$exists': True}},
+        projection={'embedding_i8': 1, 'embedding_scale': 1, 'embedding_norm': 1},
+    ))
+    rows = [np.frombuffer(doc.pop('embedding_i8'), dtype=np.int8) for doc in docs]
+    scales = [doc.pop('embedding_scale') for doc in docs]
+    norms = [doc.pop('embedding_norm', np.nan) for doc in docs]
+
+    # Documents without an int8 copy (older runs, MongoDBAtlasVectorSearch.add_documents):
+    # quantize their float embedding here so the fallback still scores them
+    legacy = list(collection.find(
+        {'embedding_i8': {'$exists': False}, 'embedding': {'$exists': True}},
+        projection={'embedding': 1},
+    ))
+    for doc in legacy:
+        vector = np.asarray(doc.pop('embedding'), dtype=np.float32)
+        quantized, scale = quantize_int8(vector)
+        rows.append(quantized)
+        scales.append(scale)
+        norms.append(float(np.linalg.norm(vector)))
+    docs.extend(legacy)
+
+    if docs:
+        matrix = np.stack(rows)
+        scales = np.asarray(scales, dtype=np.float32)
+        norms = np.asarray(norms, dtype=np.float32)
+        # Documents stored before norms were persisted: derive from the int8 copy once
+        missing = np.isnan(norms)
+        norms[missing] = np.linalg.norm(matrix[missing].astype(np.float32), axis=1) * scales[missing]
+        weights = scales / (norms + 1e-12)
+    else:
+        matrix = np.empty((0, 0), dtype=np.int8)
+        weights = np.empty(0, dtype=np.float32)
+
+    _cache["matrix"] = matrix
+    _cache["weights"] = weights
+    _cache["ids"] = [doc['_id'] for doc in docs]
+
+
+def cosine_similarities(doc_matrix: np.ndarray, doc_weights: np.ndarray, query_embedding) -> np.ndarray:
+    """Cosine similarity between the query and every row of the int8 doc_matrix.
+
+    doc_weights holds scale / norm per document (both persisted at insert time),
+    so the per-query work is one dot product per row and no square roots:
+    cos(q, d) = (d_i8 . q) * scale_d / (norm_d * norm_q).
+    Uses SimSIMD when installed and otherwise falls back to a NumPy
+    matrix-vector product.
+    Returns a float32 array whose positions line up with the cached document ids.
+    """
+    query_embedding = np.asarray(query_embedding, dtype=np.float32)
+    # Every query-only term folds into one scalar, applied once per row
+    query_factor = 1.0 / (float(np.linalg.norm(query_embedding)) + 1e-12)
+
+    if simsimd is not None:
+        query_i8, query_scale = quantize_int8(query_embedding)
+        dots = np.asarray(simsimd.cdist(query_i8.reshape(1, -1), doc_matrix, metric="dot")).ravel()
+        query_factor *= query_scale
+    else:
+        dots = doc_matrix.astype(np.float32) @ query_embedding
+
+    # Scores stay one contiguous float32 array, parallel to the cached ids list
+    return (dots * doc_weights * query_factor).astype(np.float32, copy=False)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return indices of the k highest scores, best first.
+
+    Uses argpartition so only the k winners get sorted instead of all N scores.
+    """
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def run_query(query: str, vector_store: MongoDBAtlasVectorSearch, embeddings: OllamaEmbeddings,
+              collection: Collection) -> str:
+    """Search one query and return its report as text.
+
+    The report is buffered instead of printed so several queries can run
+    concurrently without interleaving their output.
+    """
+    out = io.StringIO()
+    print(f"\n📌 Query: {query}", file=out)
+    print("-" * 60, file=out)
+
+    try:
+        # Try Atlas Vector Search first
+        try:
+            results = vector_store.similarity_search(query, k=TOP_K)
+            if results:
+                print(f"   ✅ Using Atlas Vector Search", file=out)
+                for i, doc in enumerate(results, 1):
+                    print(f"\n   Result {i}:", file=out)
+                    print(f"   Course: {doc.metadata.get('course', 'N/A')}", file=out)
+                    print(f"   Topic: {doc.metadata.get('topic', 'N/A')}", file=out)
+                    print(f"   Students: {doc.metadata.get('students', 'N/A')}", file=out)
+                    print(f"   Content: {doc.page_content[:150]}...", file=out)
+                return out.getvalue()
+        except Exception as atlas_error:
+            print(f"   ⚠️  Atlas Vector Search not available: {str(atlas_error)[:100]}", file=out)
+            print(f"   🔄 Falling back to manual similarity search...", file=out)
+
+        # Manual fallback: compute similarities locally on int8 embeddings.
+        # Atlas already embedded this text, so this is a query-LRU hit, not an Ollama call
+        query_embedding = embeddings.embed_query(query)
+
+        # Score against the in-memory matrix (loaded from MongoDB on first use)
+        doc_matrix, doc_weights, doc_ids = ensure_cache_warm(collection)
+
+        if not doc_ids:
+            print("   No documents in collection", file=out)
+            return out.getvalue()
+
+        similarities = cosine_similarities(doc_matrix, doc_weights, query_embedding)
+
+        # Partial selection: O(N) to find the TOP_K winners, then sort only those
+        top = top_k_indices(similarities, TOP_K)
+        top_ids = [doc_ids[idx] for idx in top]
+
+        # Fetch display fields for the top results only
+        top_docs = {
+            doc['_id']: doc
+            for doc in collection.find({'_id': {'$in': top_ids}}, projection={'embedding': 0, 'embedding_i8': 0})
+        }
+
+        # Show top results
+        for i, (idx, doc_id) in enumerate(zip(top, top_ids), 1):
+            score = similarities[idx]
+            doc_data = top_docs.get(doc_id, {})
+            print(f"\n   Result {i} (similarity: {score:.4f}):", file=out)
+            # MongoDB stores metadata fields at top level
+            metadata = doc_data.get('metadata', {})
+            print(f"   Course: {doc_data.get('course', metadata.get('course', 'N/A'))}", file=out)
+            print(f"   Topic: {doc_data.get('topic', metadata.get('topic', 'N/A'))}", file=out)
+            print(f"   Students: {doc_data.get('students', metadata.get('students', 'N/A'))}", file=out)
+            content = doc_data.get('page_content', doc_data.get('text', ''))
+            print(f"   Content: {content[:150]}...", file=out)
+
+    except Exception as e:
+        print(f"   ❌ Search error: {e}", file=out)
+        traceback.print_exc(file=out)
+
+    return out.getvalue()
+
 
 def main():
     print("🚀 MongoDB Atlas Vector Search with LangChain")
@@ -74,20 +338,26 @@ def main():
     print(f"   Index: {INDEX_NAME}")
 
     client = MongoClient(MONGODB_URI)
-    embeddings = OllamaEmbeddings(model=EMBED_MODEL)
+    embeddings = CachedOllamaEmbeddings(model=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE, **ollama_client_kwargs())
 
     # Get vector store
     vector_store = get_vector_store(client, embeddings)
+    collection = client[DB_NAME][COLLECTION_NAME]
+
+    # Make sure Atlas Vector Search has an index to query
+    print(f"\n🗂️  Ensuring Vector Search index '{INDEX_NAME}' exists...")
+    has_vector_index = ensure_vector_index(collection)
+    if has_vector_index:
+        print("✅ Vector Search index ready (Atlas may still be building it)")
 
     # Add documents
     print(f"\n📝 Adding {len(DOCUMENTS)} documents to MongoDB...")
     try:
-        # MongoDBAtlasVectorSearch.add_documents handles embedding automatically
-        ids = vector_store.add_documents(DOCUMENTS)
+        # Store float embeddings for Atlas plus int8 copies for the local fallback
+        ids = add_documents(collection, embeddings, DOCUMENTS)
         print(f"✅ Successfully indexed {len(ids)} documents")
 
         # Verify what was stored
-        collection = client[DB_NAME][COLLECTION_NAME]
         doc_count = collection.count_documents({})
         print(f"📊 Total documents in collection: {doc_count}")
 
@@ -99,7 +369,6 @@ def main():
     except Exception as e:
         print(f"⚠️  Error adding documents: {e}")
         print("   (Documents might already exist, continuing...)")
-        import traceback
         traceback.print_exc()
 
     # Example queries
@@ -113,82 +382,25 @@ def main():
     print("🔍 Running similarity searches:")
     print("=" * 60)
 
-    for query in queries:
-        print(f"\n📌 Query: {query}")
-        print("-" * 60)
-
-        try:
-            # Try Atlas Vector Search first
-            try:
-                results = vector_store.similarity_search(query, k=2)
-                if results:
-                    print(f"   ✅ Using Atlas Vector Search")
-                    for i, doc in enumerate(results, 1):
-                        print(f"\n   Result {i}:")
-                        print(f"   Course: {doc.metadata.get('course', 'N/A')}")
-                        print(f"   Topic: {doc.metadata.get('topic', 'N/A')}")
-                        print(f"   Students: {doc.metadata.get('students', 'N/A')}")
-                        print(f"   Content: {doc.page_content[:150]}...")
-                    continue
-            except Exception as atlas_error:
-                print(f"   ⚠️  Atlas Vector Search not available: {str(atlas_error)[:100]}")
-                print(f"   🔄 Falling back to manual similarity search...")
-
-            # Manual fallback: compute similarities locally
-            import math
-            query_embedding = embeddings.embed_query(query)
-
-            # Get all documents from collection
-            collection = client[DB_NAME][COLLECTION_NAME]
-            all_docs = list(collection.find({}))
-
-            if not all_docs:
-                print("   No documents in collection")
-                continue
-
-            # Calculate cosine similarity for each
-            scored_docs = []
-            for doc_data in all_docs:
-                if 'embedding' not in doc_data:
-                    continue
-
-                doc_embedding = doc_data['embedding']
-
-                # Cosine similarity
-                dot_product = sum(a * b for a, b in zip(query_embedding, doc_embedding))
-                mag_a = math.sqrt(sum(a * a for a in query_embedding))
-                mag_b = math.sqrt(sum(b * b for b in doc_embedding))
-                similarity = dot_product / (mag_a * mag_b) if (mag_a * mag_b) > 0 else 0.0
-
-                scored_docs.append((similarity, doc_data))
-
-            # Sort by similarity (highest first)
-            scored_docs.sort(key=lambda x: x[0], reverse=True)
-
-            # Show top 2 results
-            for i, (score, doc_data) in enumerate(scored_docs[:2], 1):
-                print(f"\n   Result {i} (similarity: {score:.4f}):")
-                # MongoDB stores metadata fields at top level
-                metadata = doc_data.get('metadata', {})
-                print(f"   Course: {doc_data.get('course', metadata.get('course', 'N/A'))}")
-                print(f"   Topic: {doc_data.get('topic', metadata.get('topic', 'N/A'))}")
-                print(f"   Students: {doc_data.get('students', metadata.get('students', 'N/A'))}")
-                content = doc_data.get('page_content', doc_data.get('text', ''))
-                print(f"   Content: {content[:150]}...")
-
-        except Exception as e:
-            print(f"   ❌ Search error: {e}")
-            import traceback
-            traceback.print_exc()
+    # Queries are independent I/O (Ollama embedding + MongoDB round-trips),
+    # so run them concurrently and print the reports in the original order
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        futures = [
+            executor.submit(run_query, query, vector_store, embeddings, collection)
+            for query in queries
+        ]
+        for future in futures:
+            print(future.result(), end="")
 
     print("\n" + "=" * 60)
     print("✅ Demo completed!")
-    print("\n💡 Note: For best performance, create a Vector Search Index in Atlas UI:")
-    print(f"   - Database: {DB_NAME}")
-    print(f"   - Collection: {COLLECTION_NAME}")
-    print(f"   - Index name: {INDEX_NAME}")
-    print("   - Field: embedding")
-    print("   - Type: knnVector")
+    if not has_vector_index:
+        print("\n💡 Note: For best performance, create a Vector Search Index in Atlas UI:")
+        print(f"   - Database: {DB_NAME}")
+        print(f"   - Collection: {COLLECTION_NAME}")
+        print(f"   - Index name: {INDEX_NAME}")
+        print("   - Field: embedding")
+        print("   - Type: vector")
 
     client.close()
 
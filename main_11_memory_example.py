@@ -2,35 +2,62 @@ import os
 from pathlib import Path
 
 from dotenv import load_dotenv
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.messages import AIMessage, HumanMessage, get_buffer_string, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_ollama import ChatOllama
+from shared_http import ollama_client_kwargs
 
 load_dotenv(dotenv_path=Path(__file__).parent / '.env')
 
 # Configuration
 OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.1:8b')
 MEMORY_K = int(os.environ.get('MEMORY_K', 5))  # Remember last 5 interactions
+MEMORY_MAX_TOKENS = int(os.environ.get('MEMORY_MAX_TOKENS', 512))  # Upper bound on remembered history
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')  # Keep model (and its prompt cache) loaded
+
+# Static preamble - always the first message so Ollama can reuse its cached prefix
+SYSTEM_PROMPT = (
+    "The following is a friendly conversation between a human and an AI. "
+    "The AI is talkative and provides lots of specific details from its context. "
+    "If the AI does not know the answer to a question, it truthfully says it does not know."
+)
+
+
+def trim_history(history: list) -> list:
+    """Keep the last MEMORY_K interactions, capped at MEMORY_MAX_TOKENS."""
+    if MEMORY_K <= 0:
+        # history[-0:] would be the whole list; k=0 means remember nothing
+        return []
+    return trim_messages(
+        history[-2 * MEMORY_K:],
+        max_tokens=MEMORY_MAX_TOKENS,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+    )
+
 
 def main():
     print("LangChain Short-Term Memory Example")
     print("=" * 60)
     print(f"Using Ollama model: {OLLAMA_MODEL}")
-    print(f"Memory window size: {MEMORY_K} interactions")
+    print(f"Memory window size: {MEMORY_K} interactions (max {MEMORY_MAX_TOKENS} tokens)")
     print()
 
     # Initialize LLM
-    llm = ChatOllama(model=OLLAMA_MODEL, temperature=0.7)
-
-    # Set up memory - ConversationBufferWindowMemory keeps last K interactions
-    memory = ConversationBufferWindowMemory(k=MEMORY_K)
+    llm = ChatOllama(model=OLLAMA_MODEL, temperature=0.7, keep_alive=OLLAMA_KEEP_ALIVE, **ollama_client_kwargs())
 
-    # Create conversation chain with memory
-    conversation = ConversationChain(
-        llm=llm,
-        memory=memory,
-        verbose=False
-    )
+    # System preamble first, then history, then the new input: the stable
+    # prefix is identical on every request, so Ollama only prefills what changed
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        MessagesPlaceholder("history"),
+        ("human", "{input}"),
+    ])
+    conversation = prompt | llm | StrOutputParser()
+    history = []
 
     print("Starting conversation with memory...")
     print("Type 'quit' to exit")
@@ -46,17 +73,23 @@ def main():
         if not user_input:
             continue
 
-        # Get response from chain (memory is automatically updated)
+        # Stream the response as it is generated, then update memory
         try:
-            response = conversation.run(input=user_input)
-            print(f"AI: {response}")
+            print("AI: ", end="", flush=True)
+            chunks = []
+            for chunk in conversation.stream({"history": history, "input": user_input}):
+                print(chunk, end="", flush=True)
+                chunks.append(chunk)
+            print()
+            response = "".join(chunks)
+            history = trim_history(history + [HumanMessage(content=user_input), AIMessage(content=response)])
         except Exception as e:
             print(f"Error: {e}")
 
         print("-" * 60)
 
     print("\nConversation ended!")
-    print(f"Final memory buffer:\n{memory.buffer}")
+    print(f"Final memory buffer:\n{get_buffer_string(history)}")
 
 if __name__ == '__main__':
     main()
@@ -1,6 +1,10 @@
+from types import MappingProxyType
+
+import orjson
 from langchain.tools import tool
 from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
 from langchain_ollama import ChatOllama
+from shared_http import ollama_client_kwargs
 
 
 # Static course database
@@ -21,6 +25,21 @@ COURSES_DB = {
     }
 }
 
+# Tool responses are static, so render them once at import time.
+# Keys are case-folded so 'flutter' and 'Flutter' hit the same entry.
+_INFO_STRINGS = MappingProxyType({
+    name.casefold(): f"Course: {course['name']}\nDescription: {course['description']}\nInstructor: {course['instructor']}\nDuration: {course['duration']}"
+    for name, course in COURSES_DB.items()
+})
+_COUNT_STRINGS = MappingProxyType({
+    name.casefold(): f"The {name} course has {course['students']} students enrolled."
+    for name, course in COURSES_DB.items()
+})
+
+
+def _not_found(course_name: str) -> str:
+    return f"Course '{course_name}' not found."
+
 
 @tool
 def get_course_info(course_name: str) -> str:
@@ -29,10 +48,8 @@ def get_course_info(course_name: str) -> str:
     Args:
         course_name: The name of the course (e.g., 'Flutter', 'Kotlin')
     """
-    course = COURSES_DB.get(course_name)
-    if course:
-        return f"Course: {course['name']}\nDescription: {course['description']}\nInstructor: {course['instructor']}\nDuration: {course['duration']}"
-    return f"Course '{course_name}' not found."
+    info = _INFO_STRINGS.get(course_name.casefold())
+    return info if info is not None else _not_found(course_name)
 
 
 @tool
@@ -42,15 +59,13 @@ def get_student_count(course_name: str) -> str:
     Args:
         course_name: The name of the course (e.g., 'Flutter', 'Kotlin')
     """
-    course = COURSES_DB.get(course_name)
-    if course:
-        return f"The {course_name} course has {course['students']} students enrolled."
-    return f"Course '{course_name}' not found."
+    count = _COUNT_STRINGS.get(course_name.casefold())
+    return count if count is not None else _not_found(course_name)
 
 
 def main():
     # Initialize local Ollama model
-    llm = ChatOllama(temperature=0, model="llama3.1:8b")
+    llm = ChatOllama(temperature=0, model="llama3.1:8b", **ollama_client_kwargs())
 
     # Define available tools
     tools = [get_course_info, get_student_count]
@@ -82,7 +97,10 @@ def main():
             'get_student_count': get_student_count
         }
 
-        # Execute each tool and collect results as ToolMessages
+        # Execute each tool and collect results as ToolMessages.
+        # Small models often repeat a call verbatim, so identical
+        # (name, args) pairs run once and later calls reuse the result.
+        seen = {}
         for tool_call in ai_message.tool_calls:
             tool_name = tool_call['name']
             tool_args = tool_call['args']
@@ -93,8 +111,13 @@ def main():
             # Execute the tool
             tool_function = tool_map.get(tool_name)
             if tool_function:
-                tool_result = tool_function.invoke(tool_args)
-                print(f"    ✓ Result: {tool_result}")
+                key = (tool_name, orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS))
+                if key in seen:
+                    tool_result = seen[key]
+                    print(f"    ↺ Reused result of identical call")
+                else:
+                    tool_result = seen[key] = tool_function.invoke(tool_args)
+                    print(f"    ✓ Result: {tool_result}")
 
                 # Create ToolMessage with the result
                 tool_message = ToolMessage(
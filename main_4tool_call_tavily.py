@@ -1,15 +1,21 @@
 from langchain.tools import tool
 from langchain_core.messages import HumanMessage, ToolMessage
 from langchain_ollama import ChatOllama
+from shared_http import ollama_client_kwargs
 from langchain_community.tools.tavily_search import TavilySearchResults
 from dotenv import load_dotenv
 import os
 from pathlib import Path
 
+import orjson
+
 # Load .env file
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Reads TOOL_CONTENT_CHARS, so imported after .env is loaded
+from tool_results import tool_message_content
+
 
 @tool
 def get_course_info(course_name: str) -> str:
@@ -37,7 +43,7 @@ def main():
         )
 
     # Initialize local Ollama model
-    llm = ChatOllama(temperature=0, model="llama3.1:8b")
+    llm = ChatOllama(temperature=0, model="llama3.1:8b", **ollama_client_kwargs())
 
     # Create Tavily search tool for real-time web search
     tavily_search = TavilySearchResults(
@@ -72,26 +78,34 @@ def main():
             print("🔧 Tools called by LLM:\n")
 
             tool_messages = []
+            # Identical (name, args) calls hit Tavily once; repeats reuse the content
+            seen = {}
             for tool_call in result.tool_calls:
                 tool_name = tool_call['name']
                 tool_args = tool_call['args']
                 print(f"  📌 Tool: {tool_name}")
                 print(f"     Args: {tool_args}")
 
-                # Execute the tool
-                if tool_name == 'get_course_info':
-                    tool_result = get_course_info.invoke(tool_args)
-                elif tool_name == 'tavily_search_results_json':
-                    tool_result = tavily_search.invoke(tool_args)
+                key = (tool_name, orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS))
+                if key in seen:
+                    content = seen[key]
+                    print(f"     Result: (reused from identical call)\n")
                 else:
-                    tool_result = f"Unknown tool: {tool_name}"
+                    # Execute the tool
+                    if tool_name == 'get_course_info':
+                        tool_result = get_course_info.invoke(tool_args)
+                    elif tool_name == 'tavily_search_results_json':
+                        tool_result = tavily_search.invoke(tool_args)
+                    else:
+                        tool_result = f"Unknown tool: {tool_name}"
 
-                print(f"     Result: {tool_result}\n")
+                    content = seen[key] = tool_message_content(tool_result)
+                    print(f"     Result: {content}\n")
 
                 # Create tool message for next LLM call
                 tool_messages.append(
                     ToolMessage(
-                        content=str(tool_result),
+                        content=content,
                         tool_call_id=tool_call['id']
                     )
                 )
@@ -3,7 +3,7 @@ Simple example of using Tavily for real-time web search with Ollama.
 This example shows how to get current information from the internet with structured responses.
 """
 from typing import List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -13,6 +13,8 @@ load_dotenv(dotenv_path=env_path)
 
 from langchain_core.messages import HumanMessage, ToolMessage
 from langchain_ollama import ChatOllama
+from shared_http import ollama_client_kwargs, pool_tavily_requests
+from tool_results import tool_message_content
 from langchain_tavily import TavilySearch
 
 
@@ -30,17 +32,27 @@ class AgentResponse(BaseModel):
     )
 
 
+# Validates a whole list of source dicts in one pydantic-core call
+_SOURCES_ADAPTER = TypeAdapter(List[Source])
+
+
+# Local Ollama model and its structured-output runnable, built once at import.
+# with_structured_output() converts AgentResponse to a JSON schema and builds
+# a parser, so it is reused instead of being rebuilt on every call.
+_LLM = ChatOllama(temperature=0, model="llama3.1:8b", **ollama_client_kwargs())
+_STRUCTURED_LLM = _LLM.with_structured_output(AgentResponse)
+# Reuse one keep-alive connection to the Tavily API across searches
+pool_tavily_requests()
+
+
 def main():
     print("🚀 Initializing Ollama and Tavily search agent...\n")
 
-    # Initialize local Ollama model
-    llm = ChatOllama(temperature=0, model="llama3.1:8b")
-
     # Create Tavily search tool
     tavily_search = TavilySearch(max_results=3)
 
     # Bind tools to LLM
-    llm_with_tools = llm.bind_tools([tavily_search])
+    llm_with_tools = _LLM.bind_tools([tavily_search])
 
     # Example query - you can change this to any real-time question
     query = "What are the latest news about AI in December 2025?"
@@ -53,7 +65,7 @@ def main():
     result = llm_with_tools.invoke([HumanMessage(content=query)])
 
     # Step 2: Execute tool calls if any
-    sources = []
+    raw_sources = []
     tool_messages = []
 
     if hasattr(result, 'tool_calls') and result.tool_calls:
@@ -66,21 +78,23 @@ def main():
             search_query = tool_args.get('query', '') if isinstance(tool_args, dict) else str(tool_args)
             search_results = tavily_search.invoke({'query': search_query})
 
-            # Extract sources
-            if isinstance(search_results, list):
-                for item in search_results:
-                    if isinstance(item, dict) and 'url' in item:
-                        sources.append(Source(
-                            url=item.get('url', ''),
-                            title=item.get('title', 'Untitled')
-                        ))
-                        print(f"   📄 {item.get('title', 'Untitled')}")
-                        print(f"      {item.get('url', '')}\n")
+            # Extract sources as plain dicts (TavilySearch wraps them in a 'results' key)
+            items = search_results.get('results', []) if isinstance(search_results, dict) else search_results
+            if isinstance(items, list):
+                found = [
+                    {'url': item.get('url', ''), 'title': item.get('title', 'Untitled')}
+                    for item in items
+                    if isinstance(item, dict) and 'url' in item
+                ]
+                for source in found:
+                    print(f"   📄 {source['title']}")
+                    print(f"      {source['url']}\n")
+                raw_sources.extend(found)
 
             # Create tool message for next LLM call
             tool_messages.append(
                 ToolMessage(
-                    content=str(search_results),
+                    content=tool_message_content(search_results),
                     tool_call_id=tool_call['id']
                 )
             )
@@ -89,11 +103,9 @@ def main():
     print("="*80 + "\n")
     print("💡 Generating structured response...\n")
 
-    # Use structured output with Pydantic model
-    structured_llm = llm.with_structured_output(AgentResponse)
-
-    # Format sources for the prompt
-    sources_text = "\n".join([f"- {s.title} ({s.url})" for s in sources])
+    # Validate all sources in one batch; format the prompt from the raw dicts
+    sources = _SOURCES_ADAPTER.validate_python(raw_sources)
+    sources_text = "\n".join(f"- {s['title']} ({s['url']})" for s in raw_sources)
 
     # Create final prompt with tool results
     final_messages = [HumanMessage(content=query), result] + tool_messages
@@ -112,7 +124,7 @@ Respond with a structured JSON containing "answer" and "sources" fields.
 
     # Get structured response
     try:
-        structured_response = structured_llm.invoke(final_messages)
+        structured_response = _STRUCTURED_LLM.invoke(final_messages)
 
         print("="*80)
         print("\n📊 STRUCTURED RESPONSE:\n")
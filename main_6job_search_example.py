@@ -2,7 +2,9 @@
 Example using Tavily search with structured responses - similar to the reference example.
 This searches for job postings and returns structured data with sources.
 """
-from typing import List
+import asyncio
+from functools import lru_cache
+from typing import List, Tuple
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from pathlib import Path
@@ -11,9 +13,17 @@ from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
 from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama import ChatOllama
 from langchain_tavily import TavilySearch
+from semantic_cache import SemanticCache
+from shared_http import close_tavily_sessions, ollama_client_kwargs, pool_tavily_requests
+
+# Exact-match LLM cache: an identical prompt to the same model is answered from disk
+set_llm_cache(SQLiteCache(database_path=str(Path(__file__).parent / '.langchain_cache.db')))
 
 
 class Source(BaseModel):
@@ -29,47 +39,93 @@ class AgentResponse(BaseModel):
     )
 
 
-def main():
-    print("🚀 Hello from langchain-course!\n")
-    print("Initializing Ollama (local) and Tavily search agent...\n")
+# Upper bound on concurrent structured-output requests in run_many()
+MAX_CONCURRENCY = 4
+
+# Minimum cosine similarity for a semantic-cache hit
+SEMANTIC_CACHE_THRESHOLD = 0.90
+
+# Local Ollama model (instead of OpenAI gpt-5) and its structured-output
+# runnable, built once at import. with_structured_output() converts
+# AgentResponse to a JSON schema and builds a parser, so it is not rebuilt per batch.
+_LLM = ChatOllama(temperature=0, model="llama3.1:8b", **ollama_client_kwargs())
+_STRUCTURED_LLM = _LLM.with_structured_output(AgentResponse)
+# Reuse keep-alive connections to the Tavily API across (async) searches
+pool_tavily_requests()
+
 
-    # Initialize local Ollama model (instead of OpenAI gpt-5)
-    llm = ChatOllama(temperature=0, model="llama3.1:8b")
+@lru_cache(maxsize=1)
+def get_llm_with_tools():
+    """Tavily search tool and the LLM bound to it, built on first use.
 
-    # Create Tavily search tool
+    TavilySearch needs TAVILY_API_KEY at construction, so it is created lazily
+    rather than at import; afterwards the same objects are reused.
+    """
     tavily_search = TavilySearch(max_results=3)
+    return tavily_search, _LLM.bind_tools([tavily_search])
 
-    # Bind tools to LLM
-    llm_with_tools = llm.bind_tools([tavily_search])
 
-    # Query similar to the reference example
-    query = "Search for 3 job postings for an AI engineer using langchain in the bay area on linkedin and list their details"
+# Closing instruction appended after the tool results; parsed once at import
+FINAL_INSTRUCTION = ChatPromptTemplate.from_messages([("human", """
+Based on the search results above, provide a comprehensive answer listing the job posting details.
 
-    print(f"❓ Query: {query}\n")
-    print("="*80 + "\n")
+Important: 
+1. In the "answer" field, list each job posting with its details (company, title, location, etc.)
+2. In the "sources" field, include the URLs where these jobs were found
+
+Available source URLs:
+{sources_text}
+
+Respond with structured JSON containing "answer" and "sources" fields.
+""")])
+
+
+async def build_final_messages(query: str) -> Tuple[list, List[Source]]:
+    """Search with Tavily and return the messages for the structured answer, plus the sources found."""
+    # Tavily search tool and the LLM with it bound
+    tavily_search, llm_with_tools = get_llm_with_tools()
 
     # Step 1: LLM decides to use search tool
     print("🔍 Agent is searching for job postings...\n")
-    result = llm_with_tools.invoke([HumanMessage(content=query)])
+    result = await llm_with_tools.ainvoke([HumanMessage(content=query)])
 
     # Step 2: Execute tool calls
     sources = []
     tool_messages = []
 
     if hasattr(result, 'tool_calls') and result.tool_calls:
-        for tool_call in result.tool_calls:
-            # Execute Tavily search - only pass the 'query' parameter
-            tool_args = tool_call['args']
-            # Filter to only include valid parameters
-            search_query = tool_args.get('query', '') if isinstance(tool_args, dict) else str(tool_args)
-            search_results = tavily_search.invoke({'query': search_query})
-
-            # Extract sources
-            if isinstance(search_results, list):
-                for item in search_results:
+        # Execute Tavily search - only pass the 'query' parameter
+        search_queries = [
+            tool_call['args'].get('query', '') if isinstance(tool_call['args'], dict) else str(tool_call['args'])
+            for tool_call in result.tool_calls
+        ]
+        # Calls that send Tavily the same query are searched once and share the
+        # result (other args are dropped above, so they must not split the key)
+        keys = [
+            (tool_call['name'], search_query)
+            for tool_call, search_query in zip(result.tool_calls, search_queries)
+        ]
+        unique_queries = dict(zip(keys, search_queries))
+
+        # The searches are independent, so run them concurrently
+        unique_results = await asyncio.gather(
+            *(tavily_search.ainvoke({'query': search_query}) for search_query in unique_queries.values())
+        )
+        results_by_key = dict(zip(unique_queries, unique_results))
+
+        seen = set()
+        for tool_call, key in zip(result.tool_calls, keys):
+            search_results = results_by_key[key]
+
+            # Extract sources (once per distinct search); TavilySearch wraps them in a 'results' key
+            items = search_results.get('results', []) if isinstance(search_results, dict) else search_results
+            if key not in seen and isinstance(items, list):
+                for item in items:
                     if isinstance(item, dict) and 'url' in item:
                         sources.append(Source(url=item.get('url', '')))
 
+            seen.add(key)
+
             # Create tool message for next LLM call
             tool_messages.append(
                 ToolMessage(
@@ -78,48 +134,74 @@ def main():
                 )
             )
 
+    # Format sources for prompt
+    sources_text = "\n".join([f"- {s.url}" for s in sources])
+
+    final_messages = [HumanMessage(content=query), result, *tool_messages,
+                      *FINAL_INSTRUCTION.format_messages(sources_text=sources_text)]
+    return final_messages, sources
+
+
+async def run_many(queries: List[str]) -> List[AgentResponse]:
+    """Answer several queries, sending the structured-output calls as one batch."""
+    prepared = await asyncio.gather(*(build_final_messages(query) for query in queries))
+
     # Step 3: Get structured response
     print("💡 Generating structured response...\n")
 
-    structured_llm = llm.with_structured_output(AgentResponse)
+    # Pass max_concurrency explicitly: without it abatch() starts every input at
+    # once, and a local Ollama server only runs a few requests in parallel
+    structured_responses = await _STRUCTURED_LLM.abatch(
+        [final_messages for final_messages, _ in prepared],
+        config={"max_concurrency": MAX_CONCURRENCY},
+    )
+    for structured_response, (_, sources) in zip(structured_responses, prepared):
+        if not structured_response.sources:
+            # Fallback
+            structured_response.sources = sources[:3]
+    return structured_responses
 
-    # Format sources for prompt
-    sources_text = "\n".join([f"- {s.url}" for s in sources])
 
-    final_messages = [HumanMessage(content=query), result] + tool_messages
-    final_messages.append(HumanMessage(content=f"""
-Based on the search results above, provide a comprehensive answer listing the job posting details.
+async def answer_query(query: str) -> AgentResponse:
+    """Search with Tavily and have the LLM build a structured answer."""
+    return (await run_many([query]))[0]
 
-Important: 
-1. In the "answer" field, list each job posting with its details (company, title, location, etc.)
-2. In the "sources" field, include the URLs where these jobs were found
 
-Available source URLs:
-{sources_text}
+async def main():
+    print("🚀 Hello from langchain-course!\n")
+    print("Initializing Ollama (local) and Tavily search agent...\n")
 
-Respond with structured JSON containing "answer" and "sources" fields.
-"""))
+    # Query similar to the reference example
+    query = "Search for 3 job postings for an AI engineer using langchain in the bay area on linkedin and list their details"
 
-    # Get structured response
-    structured_response = structured_llm.invoke(final_messages)
+    print(f"❓ Query: {query}\n")
+    print("="*80 + "\n")
+
+    # Answer semantically repeated queries from the cache instead of re-running the agent
+    cache = SemanticCache(namespace=Path(__file__).stem, threshold=SEMANTIC_CACHE_THRESHOLD)
+    cached = cache.lookup(query)
+    if cached is not None:
+        print("⚡ Semantic cache hit - reusing a previous answer\n")
+        structured_response = AgentResponse.model_validate_json(cached)
+    else:
+        try:
+            structured_response = await answer_query(query)
+        finally:
+            await close_tavily_sessions()
+        cache.update(query, structured_response.model_dump_json())
 
     print("="*80)
     print("\n📊 RESULT:\n")
     print(f"Answer:\n{structured_response.answer}\n")
 
     print("\nSources:")
-    if structured_response.sources:
-        for idx, source in enumerate(structured_response.sources, 1):
-            print(f"  {idx}. {source.url}")
-    else:
-        # Fallback
-        for idx, source in enumerate(sources[:3], 1):
-            print(f"  {idx}. {source.url}")
+    for idx, source in enumerate(structured_response.sources, 1):
+        print(f"  {idx}. {source.url}")
 
     print("\n" + "="*80)
     print("\n✅ Done!")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Literal
 from dotenv import load_dotenv
 from pathlib import Path
@@ -6,16 +7,29 @@ from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain_ollama import ChatOllama
 from langchain_tavily import TavilySearch
+from react_graph import make_tool_node, stream_graph
+from semantic_cache import SemanticCache
+from shared_http import ollama_client_kwargs, pool_tavily_requests
 from langgraph.graph import MessagesState, StateGraph, END
-from langgraph.prebuilt import ToolNode
+
+# Exact-match LLM cache: an identical prompt to the same model is answered from disk
+set_llm_cache(SQLiteCache(database_path=str(Path(__file__).parent / '.langchain_cache.db')))
 
 AGENT_REASON = "agent_reason"
 ACT = "act"
 LAST = -1
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')  # Keep model (and its prompt cache) loaded
+OLLAMA_NUM_CTX = 4096  # Fixed context window; a changed num_ctx forces Ollama to reload the model
+ROUTER_MODEL = os.environ.get('ROUTER_MODEL', 'llama3.2:1b')  # Small model for the tool-routing turns
+ROUTER_MAX_MESSAGES = 2  # Only the first turn (the user query alone) is routed by ROUTER_MODEL
+SEMANTIC_CACHE_THRESHOLD = 0.97  # Strict: answers come from live search, near-paraphrases only
+SEMANTIC_CACHE_TTL = 60 * 60  # Live search results go stale quickly
 
 
 @tool
@@ -38,11 +52,38 @@ def validate_env() -> None:
         raise EnvironmentError("TAVILY_API_KEY not found in .env file")
 
 
+# Built once at import and reused on every reasoning turn, so the resident
+# models can reuse their cached prompt prefixes across turns. The small router
+# picks the first tool calls; the generator writes the answer.
+_ROUTER = ChatOllama(temperature=0, model=ROUTER_MODEL, keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX,
+                     **ollama_client_kwargs())
+_GENERATOR = ChatOllama(temperature=0, model="llama3.1:8b", keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX,
+                        **ollama_client_kwargs())
+# Reuse one keep-alive connection to the Tavily API across searches
+pool_tavily_requests()
+
+
+@lru_cache(maxsize=1)
+def get_tools() -> list:
+    """Tools shared by the reasoning node and the tool node.
+
+    Built on first use because TavilySearch needs TAVILY_API_KEY at construction.
+    """
+    return [TavilySearch(max_results=3), calculator]
+
+
+@lru_cache(maxsize=2)
+def get_llm_with_tools(routing: bool = False):
+    """Router or generator with the tools bound; bind_tools builds a new runnable on each call."""
+    return (_ROUTER if routing else _GENERATOR).bind_tools(get_tools())
+
+
 def run_agent_reasoning(state: MessagesState) -> MessagesState:
-    llm = ChatOllama(temperature=0, model="llama3.1:8b")
-    tavily_search = TavilySearch(max_results=3)
-    llm_with_tools = llm.bind_tools([tavily_search, calculator])
-    response = llm_with_tools.invoke(state["messages"])
+    routing = len(state["messages"]) < ROUTER_MAX_MESSAGES
+    response = get_llm_with_tools(routing).invoke(state["messages"])
+    if routing and not response.tool_calls:
+        # The router only picks tools; a direct answer comes from the generator
+        response = get_llm_with_tools().invoke(state["messages"])
     return {"messages": [response]}
 
 
@@ -66,9 +107,7 @@ def build_graph() -> StateGraph:
 
     flow.add_node(AGENT_REASON, run_agent_reasoning)
 
-    tavily_search = TavilySearch(max_results=3)
-    tool_node = ToolNode([tavily_search, calculator])
-    flow.add_node(ACT, tool_node)
+    flow.add_node(ACT, make_tool_node(get_tools()))
 
     flow.set_entry_point(AGENT_REASON)
     flow.add_conditional_edges(AGENT_REASON, should_continue, {"act": ACT, "end": END})
@@ -91,14 +130,21 @@ def main():
 
     print(f"Query: {query}\n")
 
-    result = app.invoke({"messages": [HumanMessage(content=query)]})
-
-    messages = result.get("messages", [])
-    if messages:
+    # Answer semantically repeated queries from the cache instead of re-running the graph
+    cache = SemanticCache(namespace=Path(__file__).stem, threshold=SEMANTIC_CACHE_THRESHOLD,
+                          ttl_seconds=SEMANTIC_CACHE_TTL)
+    cached = cache.lookup(query)
+    if cached is not None:
+        print("⚡ Semantic cache hit - reusing a previous answer")
         print("\n" + "="*60)
-        print(messages[LAST].content)
+        print(cached)
         print("="*60)
-        print(f"\nTotal messages: {len(messages)}")
+    else:
+        # Stream the answer as it is generated instead of waiting for the full run
+        messages = stream_graph(app, query, AGENT_REASON)
+        if messages:
+            print(f"\nTotal messages: {len(messages)}")
+            cache.update(query, messages[LAST].content)
 
     print("\n✅ Done!")
 
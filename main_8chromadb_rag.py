@@ -1,3 +1,7 @@
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
 from typing import Literal
 from dotenv import load_dotenv
 from pathlib import Path
@@ -5,15 +9,27 @@ from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain_ollama import ChatOllama
+from react_graph import make_tool_node, stream_graph
+from semantic_cache import SemanticCache
+from shared_http import ollama_client_kwargs
 from langgraph.graph import MessagesState, StateGraph, END
-from langgraph.prebuilt import ToolNode
+
+# Exact-match LLM cache: an identical prompt to the same model is answered from disk
+set_llm_cache(SQLiteCache(database_path=str(Path(__file__).parent / '.langchain_cache.db')))
 
 AGENT_REASON = "agent_reason"
 ACT = "act"
 LAST = -1
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')  # Keep model (and its prompt cache) loaded
+OLLAMA_NUM_CTX = 4096  # Fixed context window; a changed num_ctx forces Ollama to reload the model
+ROUTER_MODEL = os.environ.get('ROUTER_MODEL', 'llama3.2:1b')  # Small model for the tool-routing turns
+ROUTER_MAX_MESSAGES = 2  # Only the first turn (the user query alone) is routed by ROUTER_MODEL
+SEMANTIC_CACHE_THRESHOLD = 0.90  # Min cosine similarity for a cached answer
 
 # Simple in-memory knowledge base (simulating vector DB)
 KNOWLEDGE_BASE = {
@@ -36,35 +52,60 @@ KNOWLEDGE_BASE = {
 }
 
 
-@tool
-def search_courses(query: str) -> str:
-    """Search ALL courses from the knowledge base that match the query. Always use this to get course information."""
-    query_lower = query.lower()
-    results = []
+# Words too common to tell courses apart; left out of the index
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "by", "for", "from", "has", "in", "is", "it", "its",
+    "of", "on", "or", "the", "to", "with",
+})
 
-    # Keywords that might indicate what user is looking for
-    search_terms = ["mobile", "android", "flutter", "kotlin", "ai", "machine", "learning", "langchain"]
 
-    # Check all courses for matches
-    for key, data in KNOWLEDGE_BASE.items():
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric words of text ("AI/ML" -> ["ai", "ml"]).
+
+    Single characters are dropped, so contraction tails like the "s" of
+    "It's" never match anything.
+    """
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 1]
+
+
+def build_index(knowledge_base: dict) -> dict:
+    """Inverted index: word -> keys of the courses whose name, topic or content mention it."""
+    index = defaultdict(set)
+    for key, data in knowledge_base.items():
         meta = data["metadata"]
-        topic_lower = meta["topic"].lower()
-        course_lower = meta["course"].lower()
+        for text in (key, meta["course"], meta["topic"], data["content"]):
+            for term in tokenize(text):
+                if term not in STOPWORDS:
+                    index[term].add(key)
+    return dict(index)
+
+
+# Built once at import; a query is then a few dict lookups and a set union
+INDEX = build_index(KNOWLEDGE_BASE)
+
 
-        # Match against query or topic
-        if (key in query_lower or
-            course_lower in query_lower or
-            any(term in topic_lower for term in query_lower.split()) or
-            any(term in query_lower for term in [key, course_lower])):
+def format_course(data: dict) -> str:
+    """Render one knowledge base entry as shown to the agent."""
+    meta = data["metadata"]
+    return f"**{meta['course']}** (Topic: {meta['topic']}, Students: {meta['students']})\n{data['content']}"
 
-            result = f"**{meta['course']}** (Topic: {meta['topic']}, Students: {meta['students']})\n{data['content']}"
-            results.append(result)
 
-    if results:
-        return "\n\n".join(results)
+@lru_cache(maxsize=256)
+def _search_courses(query: str) -> str:
+    hits = set().union(*(INDEX.get(term, ()) for term in tokenize(query)))
+
+    # Render matches in knowledge base order
+    if hits:
+        return "\n\n".join(format_course(data) for key, data in KNOWLEDGE_BASE.items() if key in hits)
     return "No courses found matching your query. Available courses: Flutter, Kotlin, LangChain, AI/ML"
 
 
+@tool
+def search_courses(query: str) -> str:
+    """Search ALL courses from the knowledge base that match the query. Always use this to get course information."""
+    return _search_courses(query)
+
+
 @tool
 def get_course_details(course_name: str) -> str:
     """Get detailed information including student count for a specific course"""
@@ -78,11 +119,25 @@ def get_course_details(course_name: str) -> str:
     return "Course not found in knowledge base."
 
 
+# Models and their tool bindings are built once, not on every reasoning turn.
+# The small router picks the first tool calls; the generator
+# writes the answer once the tool results are in.
+_ROUTER = ChatOllama(temperature=0, model=ROUTER_MODEL, keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX,
+                     **ollama_client_kwargs())
+_GENERATOR = ChatOllama(temperature=0, model="llama3.1:8b", keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX,
+                        **ollama_client_kwargs())
+_ROUTER_WITH_TOOLS = _ROUTER.bind_tools([search_courses, get_course_details])
+_GENERATOR_WITH_TOOLS = _GENERATOR.bind_tools([search_courses, get_course_details])
+
+
 def run_agent_reasoning(state: MessagesState) -> MessagesState:
     """Agent decides what to do based on the current state"""
-    llm = ChatOllama(temperature=0, model="llama3.1:8b")
-    llm_with_tools = llm.bind_tools([search_courses, get_course_details])
+    routing = len(state["messages"]) < ROUTER_MAX_MESSAGES
+    llm_with_tools = _ROUTER_WITH_TOOLS if routing else _GENERATOR_WITH_TOOLS
     response = llm_with_tools.invoke(state["messages"])
+    if routing and not response.tool_calls:
+        # The router only picks tools; a direct answer comes from the generator
+        response = _GENERATOR_WITH_TOOLS.invoke(state["messages"])
     return {"messages": [response]}
 
 
@@ -108,8 +163,7 @@ def build_graph() -> StateGraph:
 
     flow.add_node(AGENT_REASON, run_agent_reasoning)
 
-    tool_node = ToolNode([search_courses, get_course_details])
-    flow.add_node(ACT, tool_node)
+    flow.add_node(ACT, make_tool_node([search_courses, get_course_details]))
 
     flow.set_entry_point(AGENT_REASON)
     flow.add_conditional_edges(AGENT_REASON, should_continue, {"act": ACT, "end": END})
@@ -132,14 +186,20 @@ def main():
 
     print(f"Query: {query}\n")
 
-    result = app.invoke({"messages": [HumanMessage(content=query)]})
-
-    messages = result.get("messages", [])
-    if messages:
+    # Answer semantically repeated queries from the cache instead of re-running the graph
+    cache = SemanticCache(namespace=Path(__file__).stem, threshold=SEMANTIC_CACHE_THRESHOLD)
+    cached = cache.lookup(query)
+    if cached is not None:
+        print("⚡ Semantic cache hit - reusing a previous answer")
         print("\n" + "="*60)
-        print(messages[LAST].content)
+        print(cached)
         print("="*60)
-        print(f"\nTotal messages: {len(messages)}")
+    else:
+        # Stream the answer as it is generated instead of waiting for the full run
+        messages = stream_graph(app, query, AGENT_REASON)
+        if messages:
+            print(f"\nTotal messages: {len(messages)}")
+            cache.update(query, messages[LAST].content)
 
     print("\n✅ Done!")
 
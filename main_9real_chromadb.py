@@ -1,46 +1,61 @@
+import os
+from functools import lru_cache
 from typing import Literal
 from dotenv import load_dotenv
 from pathlib import Path
-import shutil
 
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Heavy integrations (Chroma, Ollama, LangGraph, the LLM cache) are imported
+# inside the functions that use them, so importing this module stays cheap
+# and has no side effects; main() does the setup.
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
-from langchain_ollama import ChatOllama
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
-from langgraph.graph import MessagesState, StateGraph, END
-from langgraph.prebuilt import ToolNode
+from react_graph import make_tool_node, stream_graph
 
 AGENT_REASON = "agent_reason"
 ACT = "act"
 LAST = -1
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')  # Keep model (and its prompt cache) loaded
+OLLAMA_NUM_CTX = 4096  # Fixed context window; a changed num_ctx forces Ollama to reload the model
+ROUTER_MODEL = os.environ.get('ROUTER_MODEL', 'llama3.2:1b')  # Small model for the tool-routing turns
+ROUTER_MAX_MESSAGES = 2  # Only the first turn (the user query alone) is routed by ROUTER_MODEL
+SEMANTIC_CACHE_THRESHOLD = 0.90  # Min cosine similarity for a cached answer
 CHROMA_DB_PATH = "./chroma_db"
 
 
-def setup_chromadb(reset=False):
-    """Create and populate real ChromaDB with course information"""
-    
-    # Reset database if requested
-    if reset and Path(CHROMA_DB_PATH).exists():
-        print("🗑️  Deleting existing ChromaDB...")
-        shutil.rmtree(CHROMA_DB_PATH)
-    
-    # Check if database already exists
-    if Path(CHROMA_DB_PATH).exists():
-        print("📂 Loading existing ChromaDB from disk...")
-        embeddings = OllamaEmbeddings(model="nomic-embed-text")
-        vectorstore = Chroma(
-            persist_directory=CHROMA_DB_PATH,
-            embedding_function=embeddings
-        )
-        print(f"✅ Loaded ChromaDB from: {Path(CHROMA_DB_PATH).absolute()}\n")
-        return vectorstore
-    
-    print("🔧 Creating new ChromaDB...")
-    print("⏳ Generating embeddings with nomic-embed-text (this may take a moment)...")
+@lru_cache(maxsize=1)
+def get_embeddings():
+    """nomic-embed-text embeddings, shared by every vector store in the process.
+
+    Vectors are cached on disk by content hash, so rebuilding the database or
+    repeating a search query does not call Ollama again.
+    """
+    from ollama_embeddings import CachedOllamaEmbeddings
+    from shared_http import ollama_client_kwargs
+
+    return CachedOllamaEmbeddings(model="nomic-embed-text", **ollama_client_kwargs())
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str = "llama3.1:8b-instruct-q8_0"):
+    """Chat model for `model`, built once and reused on every reasoning turn."""
+    from langchain_ollama import ChatOllama
+    from shared_http import ollama_client_kwargs
+
+    return ChatOllama(temperature=0, model=model, keep_alive=OLLAMA_KEEP_ALIVE, num_ctx=OLLAMA_NUM_CTX,
+                      **ollama_client_kwargs())
+
+
+def setup_chromadb():
+    """Create or update the persistent ChromaDB with course information.
+
+    Documents are stored under their metadata "id", so a rerun only writes
+    courses that are new or whose text or metadata changed, and removes ones
+    that were dropped from the list below.
+    """
+    from langchain_chroma import Chroma
 
     # Course information
     documents = [
@@ -59,73 +74,79 @@ def setup_chromadb(reset=False):
         {"course": "General", "topic": "Platform Info", "students": 550, "id": "general"}
     ]
     
-    # Create embeddings using nomic-embed-text (optimized for embeddings)
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-
-    # Create ChromaDB vector store
-    vectorstore = Chroma.from_texts(
-        texts=documents,
-        embedding=embeddings,
-        metadatas=metadatas,
-        persist_directory=CHROMA_DB_PATH
+    ids = [meta["id"] for meta in metadatas]
+
+    print("📂 Opening ChromaDB...")
+    vectorstore = Chroma(
+        persist_directory=CHROMA_DB_PATH,
+        embedding_function=get_embeddings()
     )
-    
-    print(f"✅ ChromaDB created at: {Path(CHROMA_DB_PATH).absolute()}")
-    print(f"📊 Stored {len(documents)} documents with vector embeddings\n")
-    
+
+    # Sync by id: drop stale entries, upsert new or edited documents
+    stored = vectorstore.get(include=["documents", "metadatas"])
+    existing = {
+        i: (d, m) for i, d, m in zip(stored["ids"], stored["documents"], stored["metadatas"])
+    }
+    stale = set(existing) - set(ids)
+    if stale:
+        vectorstore.delete(ids=list(stale))
+    changed = [(i, d, m) for i, d, m in zip(ids, documents, metadatas) if existing.get(i) != (d, m)]
+    if changed:
+        print(f"⏳ Embedding {len(changed)} new or edited document(s) with nomic-embed-text...")
+        # add_texts upserts, so edited ids are overwritten in place
+        vectorstore.add_texts(
+            [d for _, d, _ in changed],
+            metadatas=[m for _, _, m in changed],
+            ids=[i for i, _, _ in changed]
+        )
+
+    print(f"✅ ChromaDB ready at: {Path(CHROMA_DB_PATH).absolute()}")
+    print(f"📊 {len(ids)} documents ({len(changed)} written, {len(stale)} removed)\n")
+
     return vectorstore
 
 
-# Initialize ChromaDB
-print("🚀 Initializing Real ChromaDB...\n")
-vectorstore = setup_chromadb(reset=True)  # Reset to use new embedding model
+def format_course(doc) -> str:
+    """Render one search hit as shown to the agent."""
+    meta = doc.metadata
+    return f"**{meta.get('course', 'Unknown')}** (Topic: {meta.get('topic', 'N/A')}, Students: {meta.get('students', 0)})\n{doc.page_content}"
 
 
-@tool
-def search_courses(query: str) -> str:
-    """Search courses using semantic similarity in ChromaDB vector database"""
-    print(f"🔍 Searching ChromaDB for: '{query}'")
-    
-    # Use similarity search (finds semantically similar content)
-    results = vectorstore.similarity_search(query, k=3)
-    
-    if results:
-        formatted_results = []
-        for doc in results:
-            meta = doc.metadata
-            result = f"**{meta.get('course', 'Unknown')}** (Topic: {meta.get('topic', 'N/A')}, Students: {meta.get('students', 0)})\n{doc.page_content}"
-            formatted_results.append(result)
-        
-        return "\n\n".join(formatted_results)
-    
-    return "No courses found in ChromaDB."
+def make_tools(vectorstore) -> list:
+    """Build the agent's tools around an already loaded vector store."""
 
+    @tool
+    def search_courses(query: str) -> str:
+        """Search courses using semantic similarity in ChromaDB vector database"""
+        print(f"🔍 Searching ChromaDB for: '{query}'")
 
-@tool
-def get_course_details(course_name: str) -> str:
-    """Get detailed information for a specific course from ChromaDB"""
-    print(f"📖 Getting details for: '{course_name}'")
-    
-    # Search for the specific course
-    results = vectorstore.similarity_search(course_name, k=1)
-    
-    if results:
-        doc = results[0]
-        meta = doc.metadata
-        return f"Course: {meta.get('course', 'Unknown')}\nTopic: {meta.get('topic', 'N/A')}\nEnrolled Students: {meta.get('students', 0)}\n\nDescription: {doc.page_content}"
-    
-    return "Course not found in ChromaDB."
+        # Use similarity search (finds semantically similar content)
+        results = vectorstore.similarity_search(query, k=3)
+
+        if results:
+            return "\n\n".join(map(format_course, results))
+
+        return "No courses found in ChromaDB."
 
+    @tool
+    def get_course_details(course_name: str) -> str:
+        """Get detailed information for a specific course from ChromaDB"""
+        print(f"📖 Getting details for: '{course_name}'")
 
-def run_agent_reasoning(state: MessagesState) -> MessagesState:
-    """Agent decides what to do based on the current state"""
-    llm = ChatOllama(temperature=0, model="llama3.1:8b-instruct-q8_0")
-    llm_with_tools = llm.bind_tools([search_courses, get_course_details])
-    response = llm_with_tools.invoke(state["messages"])
-    return {"messages": [response]}
+        # Search for the specific course
+        results = vectorstore.similarity_search(course_name, k=1)
+
+        if results:
+            doc = results[0]
+            meta = doc.metadata
+            return f"Course: {meta.get('course', 'Unknown')}\nTopic: {meta.get('topic', 'N/A')}\nEnrolled Students: {meta.get('students', 0)}\n\nDescription: {doc.page_content}"
 
+        return "Course not found in ChromaDB."
 
-def should_continue(state: MessagesState) -> Literal["act", "end"]:
+    return [search_courses, get_course_details]
+
+
+def should_continue(state: dict) -> Literal["act", "end"]:
     """Decide whether to continue using tools or end"""
     messages = state.get("messages", [])
     if not messages:
@@ -141,14 +162,31 @@ def should_continue(state: MessagesState) -> Literal["act", "end"]:
         return "end"
 
 
-def build_graph() -> StateGraph:
+def build_graph(tools: list):
     """Build the LangGraph workflow"""
+    from langgraph.graph import MessagesState, StateGraph, END
+    
+    # Tool bindings are built once per graph, not on every reasoning turn. The
+    # small router picks the first tool calls; the generator
+    # writes the answer once the tool results are in.
+    router_with_tools = get_llm(ROUTER_MODEL).bind_tools(tools)
+    generator_with_tools = get_llm().bind_tools(tools)
+
+    def run_agent_reasoning(state):
+        """Agent decides what to do based on the current state"""
+        routing = len(state["messages"]) < ROUTER_MAX_MESSAGES
+        llm_with_tools = router_with_tools if routing else generator_with_tools
+        response = llm_with_tools.invoke(state["messages"])
+        if routing and not response.tool_calls:
+            # The router only picks tools; a direct answer comes from the generator
+            response = generator_with_tools.invoke(state["messages"])
+        return {"messages": [response]}
+
     flow = StateGraph(MessagesState)
 
     flow.add_node(AGENT_REASON, run_agent_reasoning)
 
-    tool_node = ToolNode([search_courses, get_course_details])
-    flow.add_node(ACT, tool_node)
+    flow.add_node(ACT, make_tool_node(tools))
 
     flow.set_entry_point(AGENT_REASON)
     flow.add_conditional_edges(AGENT_REASON, should_continue, {"act": ACT, "end": END})
@@ -158,13 +196,19 @@ def build_graph() -> StateGraph:
 
 
 def main():
+    from langchain_community.cache import SQLiteCache
+    from langchain_core.globals import set_llm_cache
+    from semantic_cache import SemanticCache
+    from tiny_vector_store import TinyVectorStore
+
+    # Exact-match LLM cache: an identical prompt to the same model is answered from disk
+    set_llm_cache(SQLiteCache(database_path=str(Path(__file__).parent / '.langchain_cache.db')))
+
     print("="*60)
     print("🚀 LangGraph with REAL ChromaDB Vector Database")
     print("="*60)
     print("⚠️  Make sure Ollama is running: 'ollama serve'\n")
 
-    app = build_graph()
-
     # Query 1: Test semantic search
     query = "Tell me about mobile app development frameworks and student enrollment?"
 
@@ -176,14 +220,27 @@ def main():
 
     print(f"Query: {query}\n")
 
-    result = app.invoke({"messages": [HumanMessage(content=query)]})
-
-    messages = result.get("messages", [])
-    if messages:
+    # Answer semantically repeated queries from the cache, before touching ChromaDB
+    cache = SemanticCache(namespace=Path(__file__).stem, embeddings=get_embeddings(),
+                          threshold=SEMANTIC_CACHE_THRESHOLD)
+    cached = cache.lookup(query)
+    if cached is not None:
+        print("⚡ Semantic cache hit - reusing a previous answer")
         print("\n" + "="*60)
-        print(messages[LAST].content)
+        print(cached)
         print("="*60)
-        print(f"\nTotal messages: {len(messages)}")
+    else:
+        # Initialize ChromaDB
+        print("🚀 Initializing Real ChromaDB...\n")
+        # ChromaDB persists the corpus; searches scan an in-memory copy of it
+        vectorstore = TinyVectorStore.from_chroma(setup_chromadb(), get_embeddings())
+
+        app = build_graph(make_tools(vectorstore))
+        # Stream the answer as it is generated instead of waiting for the full run
+        messages = stream_graph(app, query, AGENT_REASON)
+        if messages:
+            print(f"\nTotal messages: {len(messages)}")
+            cache.update(query, messages[LAST].content)
 
     print("\n✅ Done!")
     print(f"\n💾 ChromaDB stored at: {Path(CHROMA_DB_PATH).absolute()}")
@@ -0,0 +1,121 @@
+"""
+Ollama embedding helpers shared by the vector search examples.
+"""
+import hashlib
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_ollama import OllamaEmbeddings
+from ollama import ResponseError
+from pydantic import PrivateAttr
+
+DEFAULT_CACHE_PATH = str(Path(__file__).parent / '.embedding_cache.sqlite3')
+
+
+class BatchedOllamaEmbeddings(OllamaEmbeddings):
+    """OllamaEmbeddings that embeds documents in batches of `batch_size`.
+
+    Each batch is a single request to Ollama's /api/embed endpoint with a list
+    input, so indexing N documents costs ceil(N / batch_size) HTTP round-trips
+    instead of N. Keeping batches bounded avoids oversized requests. Servers
+    that predate /api/embed are detected once and embedded one text at a time
+    through the legacy /api/embeddings endpoint.
+    """
+
+    batch_size: int = 32
+    """Maximum number of texts sent to Ollama in one /api/embed request."""
+
+    _legacy_endpoint: bool = PrivateAttr(default=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs, one /api/embed request per batch."""
+        embedded = []
+        for start in range(0, len(texts), self.batch_size):
+            embedded.extend(self._embed_batch(texts[start:start + self.batch_size]))
+        return embedded
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if not self._legacy_endpoint:
+            try:
+                return super().embed_documents(texts)
+            except ResponseError as error:
+                # Unknown route (not a missing model): server is older than /api/embed
+                if error.status_code != 404 or "page not found" not in str(error.error):
+                    raise
+                self._legacy_endpoint = True
+        return [
+            list(self._client.embeddings(
+                self.model, text, options=self._default_params, keep_alive=self.keep_alive
+            )["embedding"])
+            for text in texts
+        ]
+
+
+class CachedOllamaEmbeddings(BatchedOllamaEmbeddings):
+    """BatchedOllamaEmbeddings with a content-hash cache in front of Ollama.
+
+    Vectors are stored in a local sqlite file keyed by sha256(model|text), so
+    re-indexing unchanged documents makes no model calls. Query vectors are
+    kept in an in-process LRU in front of the same file, so a query repeated
+    within a run or across reruns is only embedded once.
+    """
+
+    cache_path: str = DEFAULT_CACHE_PATH
+    """sqlite file holding cached document embeddings."""
+
+    query_cache_size: int = 1024
+    """Number of query embeddings kept in the in-process LRU."""
+
+    _query_cache: Optional[Callable[[str], Tuple[float, ...]]] = PrivateAttr(default=None)
+
+    def _cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}|{text}".encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.cache_path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        return connection
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs, sending only cache misses to Ollama."""
+        keys = [self._cache_key(text) for text in texts]
+
+        with self._connect() as connection:
+            cached: Dict[str, List[float]] = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for key, blob in rows:
+                    cached[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            misses = {key: text for key, text in zip(keys, texts) if key not in cached}
+            if misses:
+                vectors = super().embed_documents(list(misses.values()))
+                connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes())
+                     for key, vector in zip(misses, vectors)],
+                )
+                cached.update(zip(misses, vectors))
+
+        connection.close()
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text, reusing the vector when the same text was seen before."""
+        if self._query_cache is None:
+            self._query_cache = lru_cache(maxsize=self.query_cache_size)(self._embed_query_uncached)
+        return list(self._query_cache(text))
+
+    def _embed_query_uncached(self, text: str) -> Tuple[float, ...]:
+        # LRU miss: fall through to the sqlite cache, then to Ollama
+        return tuple(self.embed_documents([text])[0])
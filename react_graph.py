@@ -0,0 +1,87 @@
+"""
+Building blocks shared by the LangGraph ReAct agents (main_7, main_8, main_9).
+
+Only langchain_core is imported here, so main_9 can keep LangGraph and the
+model integrations out of its import path.
+"""
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+LAST = -1
+MAX_CONCURRENCY = 4  # Parallel graph runs in run_many()
+
+
+def make_tool_node(tools: list):
+    """Tool node that runs every tool call of the last AI message concurrently.
+
+    The calls are fanned out with one RunnableLambda.batch() whose
+    max_concurrency is set explicitly to the number of tools. A failing or
+    unknown tool becomes an error ToolMessage, as with the prebuilt ToolNode,
+    so the model can recover on its next turn.
+    """
+    tools_by_name = {t.name: t for t in tools}
+
+    def call_tool(tool_call: dict) -> ToolMessage:
+        selected = tools_by_name.get(tool_call["name"])
+        if selected is None:
+            return ToolMessage(content=f"Error: unknown tool {tool_call['name']!r}",
+                               tool_call_id=tool_call["id"], status="error")
+        try:
+            # Invoked with a tool call, a tool returns its ToolMessage
+            return selected.invoke({**tool_call, "type": "tool_call"})
+        except Exception as e:
+            return ToolMessage(content=f"Error: {e!r}", tool_call_id=tool_call["id"], status="error")
+
+    tool_router = RunnableLambda(call_tool)
+
+    def act(state):
+        tool_calls = state["messages"][LAST].tool_calls
+        return {"messages": tool_router.batch(tool_calls, config={"max_concurrency": len(tools)})}
+
+    return act
+
+
+def run_many(app, queries: list) -> list:
+    """Run the graph for several queries and return each final answer.
+
+    Batch entry point for callers that import an agent script, e.g.
+    run_many(main_8chromadb_rag.build_graph(), [...]); each script's main()
+    answers a single query with stream_graph(). max_concurrency is passed
+    explicitly: without it batch() runs on the executor's default worker
+    count rather than a bound the local Ollama server can actually serve in
+    parallel.
+    """
+    results = app.batch(
+        [{"messages": [HumanMessage(content=query)]} for query in queries],
+        config={"max_concurrency": MAX_CONCURRENCY},
+    )
+    return [result["messages"][LAST].content for result in results]
+
+
+def stream_graph(app, query: str, agent_node: str) -> list:
+    """Run the graph for one query, printing the agent's text as it is generated.
+
+    Only tokens produced by `agent_node` (the reasoning node) are printed.
+    Returns the final message list. Tokens come from the "messages" stream;
+    the "values" stream carries the graph state after each step.
+    """
+    messages = []
+    streamed = False
+    for mode, payload in app.stream({"messages": [HumanMessage(content=query)]}, stream_mode=["messages", "values"]):
+        if mode == "values":
+            messages = payload.get("messages", [])
+            continue
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") == agent_node and isinstance(chunk.content, str) and chunk.content:
+            if not streamed:
+                print("\n" + "="*60)
+                streamed = True
+            print(chunk.content, end="", flush=True)
+
+    if streamed:
+        print("\n" + "="*60)
+    elif messages:
+        print("\n" + "="*60)
+        print(messages[LAST].content)
+        print("="*60)
+    return messages
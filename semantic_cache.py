@@ -0,0 +1,136 @@
+"""
+Semantic response cache shared by the agent examples.
+
+A query is embedded and compared (cosine similarity over L2-normalized
+vectors) with the queries answered before in the same namespace; when the
+best match clears the threshold and has not expired, its stored response is
+returned and the whole agent run is skipped. Queries containing digits are
+only served on an exact (case- and whitespace-insensitive) match, since
+embeddings barely separate "12 * 34" from "56 * 78". The cache is an
+optimization only: any failure (e.g. the embedding model not being pulled)
+is reported once and treated as a miss.
+"""
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ollama_embeddings import CachedOllamaEmbeddings
+from shared_http import ollama_client_kwargs
+
+DEFAULT_CACHE_PATH = str(Path(__file__).parent / '.semantic_cache.sqlite3')
+
+
+class SemanticCache:
+    """Responses keyed by query embedding, persisted in a local sqlite file.
+
+    Entries are namespaced (one namespace per example script) so one agent
+    never answers with another's cached output. The namespace's vectors are
+    kept in memory as a normalized (N, D) float32 matrix, so a lookup is a
+    single matrix-vector product.
+    """
+
+    def __init__(self, namespace: str, embeddings: Optional[Embeddings] = None,
+                 cache_path: str = DEFAULT_CACHE_PATH, threshold: float = 0.90,
+                 ttl_seconds: float = 24 * 60 * 60):
+        self.namespace = namespace
+        self.embeddings = embeddings or CachedOllamaEmbeddings(model="nomic-embed-text", **ollama_client_kwargs())
+        self.cache_path = cache_path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._matrix = None
+        self._queries = []
+        self._responses = []
+        self._expires_at = None
+        self._warned = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.cache_path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "namespace TEXT NOT NULL, query TEXT NOT NULL, vector BLOB NOT NULL, "
+            "response TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, query))"
+        )
+        return connection
+
+    def _warn(self, error: Exception) -> None:
+        if not self._warned:
+            print(f"⚠️  Semantic cache unavailable, treating as a miss: {error!r}")
+            self._warned = True
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def _load(self) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            rows = connection.execute(
+                "SELECT query, vector, response, expires_at FROM responses WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchall()
+        connection.close()
+
+        if rows:
+            self._matrix = np.stack([np.frombuffer(vector, dtype=np.float32) for _, vector, _, _ in rows])
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._queries = [self._normalize(query) for query, _, _, _ in rows]
+        self._responses = [response for _, _, response, _ in rows]
+        self._expires_at = np.asarray([expires_at for _, _, _, expires_at in rows], dtype=np.float64)
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Return the cached response for a similar enough query, or None."""
+        try:
+            return self._lookup(query)
+        except Exception as error:
+            self._warn(error)
+            return None
+
+    def _lookup(self, query: str) -> Optional[str]:
+        if self._matrix is None:
+            self._load()
+        if not self._responses:
+            return None
+
+        if re.search(r"\d", query):
+            # Numbers change the answer but hardly move the embedding
+            normalized = self._normalize(query)
+            for i, cached_query in enumerate(self._queries):
+                if cached_query == normalized and self._expires_at[i] > time.time():
+                    return self._responses[i]
+            return None
+
+        scores = self._matrix @ self._embed(query)
+        scores[self._expires_at <= time.time()] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return self._responses[best]
+
+    def update(self, query: str, response: str) -> None:
+        """Store the response for query, replacing any earlier entry for the same text."""
+        try:
+            self._update(query, response)
+        except Exception as error:
+            self._warn(error)
+
+    def _update(self, query: str, response: str) -> None:
+        vector = self._embed(query)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (namespace, query, vector, response, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, query, vector.tobytes(), response, time.time() + self.ttl_seconds),
+            )
+        connection.close()
+        # Reload on the next lookup so the in-memory matrix matches the file
+        self._matrix = None
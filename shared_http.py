@@ -0,0 +1,91 @@
+"""
+Shared HTTP connection pools for the Ollama- and Tavily-backed examples.
+
+ChatOllama and OllamaEmbeddings each build their own httpx client, so instead
+of a client instance we share one transport: every model created with
+ollama_client_kwargs() draws keep-alive connections from the same pool
+instead of opening a new connection per request. HTTP/2 is negotiated when
+the Ollama host is served over TLS; plain-HTTP local servers keep using
+pooled HTTP/1.1 connections. Async calls (ainvoke/abatch) get a second,
+async transport; its connections belong to the event loop that opened them,
+so async callers should run under a single asyncio.run() as main_6 does.
+
+pool_tavily_requests() does the same for langchain_tavily, which otherwise
+opens (and TLS-handshakes) a new connection for every search, sync or async.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+
+LIMITS = httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=120)
+TRANSPORT = httpx.HTTPTransport(retries=3, http2=True, limits=LIMITS)
+ASYNC_TRANSPORT = httpx.AsyncHTTPTransport(retries=3, http2=True, limits=LIMITS)
+TIMEOUT = httpx.Timeout(300, connect=10)
+
+
+def ollama_client_kwargs() -> dict:
+    """Keyword arguments that make an Ollama model use the shared pools."""
+    return {
+        "client_kwargs": {"timeout": TIMEOUT},
+        "sync_client_kwargs": {"transport": TRANSPORT},
+        "async_client_kwargs": {"transport": ASYNC_TRANSPORT},
+    }
+
+
+class _PooledAiohttp:
+    """Stands in for the aiohttp module inside langchain_tavily.
+
+    ClientSession() yields one shared session per event loop instead of a
+    new session (and connection) per search, and leaves it open on exit.
+    """
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self.sessions = {}
+
+    @asynccontextmanager
+    async def ClientSession(self):
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session = self.sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+            self.sessions[loop] = session
+        yield session
+
+    async def close(self) -> None:
+        session = self.sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+def pool_tavily_requests(pool_size: int = 16) -> None:
+    """Send langchain_tavily's API calls through keep-alive sessions.
+
+    TavilySearch posts with the module-level requests.post, which builds a
+    throwaway session per call, and its async path opens a new
+    aiohttp.ClientSession per call. Pointing that module's `requests` and
+    `aiohttp` names at pooled sessions keeps the connection to the Tavily API
+    open across searches. Async callers close theirs with
+    close_tavily_sessions() before their event loop ends.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from langchain_tavily import _utilities
+
+    if isinstance(_utilities.requests, requests.Session):
+        return
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    _utilities.requests = session
+    _utilities.aiohttp = _PooledAiohttp(pool_size)
+
+
+async def close_tavily_sessions() -> None:
+    """Close the pooled async Tavily session of the running event loop, if any."""
+    from langchain_tavily import _utilities
+
+    if isinstance(_utilities.aiohttp, _PooledAiohttp):
+        await _utilities.aiohttp.close()
@@ -0,0 +1,65 @@
+"""
+In-memory vector search for corpora small enough to scan exactly.
+"""
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class TinyVectorStore:
+    """Cosine search over L2-normalized vectors held in one int8 NumPy matrix.
+
+    For a handful of documents a flat inner-product scan is a single small
+    matrix-vector product, cheaper than an HNSW traversal plus the sqlite
+    reads a persistent store does per query. Each row is stored as symmetric
+    int8 codes plus one float32 scale (row ~= codes * scale), a quarter of the
+    float32 size; at 768 dimensions the ranking error is negligible. Texts and
+    metadata live in lists parallel to the matrix rows; similarity_search
+    mirrors the LangChain vector store method of the same name.
+    """
+
+    def __init__(self, embeddings: Embeddings, texts: List[str], metadatas: Optional[List[dict]] = None,
+                 vectors=None):
+        self.embeddings = embeddings
+        self.texts = list(texts)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.texts]
+        if not self.texts:
+            # Empty collection: nothing to scan
+            self._codes = np.empty((0, 0), dtype=np.int8)
+            self._scales = np.empty(0, dtype=np.float32)
+            return
+        if vectors is None:
+            vectors = embeddings.embed_documents(self.texts)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(self.texts), -1)
+        matrix = matrix / (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12)
+
+        # Per-row scale so each row uses the full int8 range
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self._codes = np.round(matrix / scales[:, None]).astype(np.int8)
+        self._scales = scales.astype(np.float32)
+
+    @classmethod
+    def from_chroma(cls, chroma, embeddings: Embeddings) -> "TinyVectorStore":
+        """Load the texts, metadata and stored embeddings of a Chroma collection.
+
+        Chroma stays the persistent source of truth; nothing is re-embedded.
+        """
+        data = chroma.get(include=["documents", "metadatas", "embeddings"])
+        return cls(embeddings, data["documents"], data["metadatas"], data["embeddings"])
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        """Return the k documents most similar to query, best first."""
+        if not self.texts:
+            return []
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        query_vector = query_vector / (np.linalg.norm(query_vector) + 1e-12)
+        scores = (self._codes @ query_vector) * self._scales
+
+        # Partial selection, then sort only the winners
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [Document(page_content=self.texts[i], metadata=self.metadatas[i] or {}) for i in top]
@@ -0,0 +1,31 @@
+"""
+Tool result serialization shared by the Tavily examples.
+
+tool_message_content() turns whatever a tool returned into the string sent
+back to the model in a ToolMessage. orjson is used instead of str() on
+nested lists of dicts, and each search result's `content` field is cut to
+TOOL_CONTENT_CHARS first: long page bodies only add prefill tokens, and the
+snippet is enough to answer from.
+"""
+import os
+
+import orjson
+
+TOOL_CONTENT_CHARS = int(os.getenv('TOOL_CONTENT_CHARS', 1000))  # Max characters kept per search result
+
+
+def _trim_content(item):
+    if isinstance(item, dict) and isinstance(item.get('content'), str) and len(item['content']) > TOOL_CONTENT_CHARS:
+        return {**item, 'content': item['content'][:TOOL_CONTENT_CHARS] + '...'}
+    return item
+
+
+def tool_message_content(result) -> str:
+    """Serialize a tool result for a ToolMessage with orjson, trimming long content fields."""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, list):
+        result = [_trim_content(item) for item in result]
+    elif isinstance(result, dict) and isinstance(result.get('results'), list):
+        result = {**result, 'results': [_trim_content(item) for item in result['results']]}
+    return orjson.dumps(result, default=str).decode()